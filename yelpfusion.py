@@ -1,14 +1,26 @@
+import io
 import os
+import math
 import time
+import pickle
+import hashlib
 import json
-import math
+import asyncio
+import aiohttp
+import diskcache
+from aiolimiter import AsyncLimiter
 import pandas as pd
 import numpy as np
-from matplotlib.patches import Rectangle
+from matplotlib.patches import Rectangle, Circle
+from matplotlib.collections import PatchCollection
 from dotenv import load_dotenv
-from yelpapi import YelpAPI
 from tqdm import tqdm
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load API key from .env
 load_dotenv()
 api_key = os.getenv('YELP_API_KEY')
@@ -28,64 +40,240 @@ GRID_COLS = 10
 cell_height = (MD_NORTH - MD_SOUTH) / GRID_ROWS
 cell_width = (MD_EAST - MD_WEST) / GRID_COLS
 
+# Optional Maryland state outline (e.g. the US Census TIGER/Line shapefile); grid cells outside it are skipped
+MD_BOUNDARY_FILE = 'tl_md.shp'
+
+# Yelp returns at most this many results per search; a cell that reaches it is split into quadrants
+YELP_MAX_RESULTS = 1000
+MAX_SUBDIVISION_DEPTH = 4
+
+# Grids with more cells than this compute search radii with Numba when it is installed
+NUMBA_MIN_CELLS = 10000
+
+# Cell status updates are kept in memory and written to CSV in batches
+GRID_SAVE_INTERVAL = 5
+# Basemap tiles downloaded by contextily are cached here between runs
+TILE_CACHE_DIR = 'tile_cache'
+# OpenStreetMap zoom level for the grid map basemap
+BASEMAP_ZOOM = 11
+# Bump when the grid map's styling changes so a cached render is not reused
+GRID_FIGURE_VERSION = 1
+# Write buffer for the restaurants CSV; rows are flushed whenever grid status is saved
+RESTAURANTS_CSV_BUFFER_BYTES = 1 << 20
+# Trailing CSV bytes stored with the restaurant ID snapshot to check the file was not rewritten
+RESTAURANT_IDS_SNAPSHOT_TAIL_BYTES = 256
+
+# Yelp Fusion REST API settings
+FETCH_DETAILS = False  # Call /businesses/{id} per business (only needed for hours, photos, etc.)
+YELP_API_BASE = 'https://api.yelp.com/v3'
+REQUEST_TIMEOUT_S = 5.0
+MAX_CONCURRENT_DETAILS = 10  # Business detail requests in flight at once
+MAX_CONCURRENT_CELLS = 4  # Grid cells searched at once
+YELP_MAX_QPS = 5  # Yelp's documented per-second request ceiling
+RATE_LIMIT_HEADROOM = 0.9  # Pace requests at 90% of the ceiling
+RATE_LIMIT_RETRIES = 3  # Retries on HTTP 429 before giving up
+RATE_LIMIT_BACKOFF_S = 1.0  # Wait after HTTP 429 when Yelp sends no Retry-After (doubles on each retry)
+TRANSIENT_STATUSES = {500, 502, 503, 504}  # Server errors worth retrying
+TRANSIENT_RETRIES = 5  # Retries on server or connection errors before giving up
+TRANSIENT_BACKOFF_S = 0.3  # Initial wait after a server or connection error (doubles on each retry)
+KEEPALIVE_TIMEOUT_S = 60  # Keep idle connections open across rate-limit pauses
+DETAILS_CACHE_DIR = '.yelp_cache'  # On-disk cache of business details, keyed by business ID
+DETAILS_CACHE_TTL_S = 7 * 86400  # Cached details expire after a week
+
+# Token bucket shared by every Yelp request, replacing fixed sleeps between calls
+rate_limiter = AsyncLimiter(YELP_MAX_QPS * RATE_LIMIT_HEADROOM, 1)
+
+# Flattened Yelp record fields written to maryland_restaurants.csv, mapped to their CSV column names
+RESTAURANT_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'rating': 'rating',
+    'review_count': 'review_count',
+    'price': 'price',
+    'categories': 'categories',
+    'location_display_address': 'address',
+    'location_city': 'city',
+    'location_state': 'state',
+    'location_zip_code': 'zip_code',
+    'coordinates_latitude': 'latitude',
+    'coordinates_longitude': 'longitude',
+    'phone': 'phone',
+    'url': 'url'
+}
+
 # Generate and export grid cell coordinates before starting search
 def generate_grid_coordinates():
-    grid_cells = []
+    # Row and column indices broadcast against each other to cover every cell at once
+    i = np.arange(GRID_ROWS)[:, None]
+    j = np.arange(GRID_COLS)[None, :]
     
-    for i in range(GRID_ROWS):
-        for j in range(GRID_COLS):
-            # Calculate cell corners
-            south = MD_SOUTH + i * cell_height
-            north = MD_SOUTH + (i + 1) * cell_height
-            west = MD_WEST + j * cell_width
-            east = MD_WEST + (j + 1) * cell_width
-            
-            # Calculate cell center
-            center_lat = (south + north) / 2
-            center_lng = (west + east) / 2
-            
-            # Calculate search radius
-            radius = calculate_search_radius(center_lat, center_lng, cell_height, cell_width)
-            
-            grid_cells.append({
-                'cell_id': f"{i}_{j}",
-                'south_lat': south,
-                'north_lat': north,
-                'west_lng': west,
-                'east_lng': east,
-                'center_lat': center_lat,
-                'center_lng': center_lng,
-                'search_radius_m': radius,
-                'done': 'no'  # Add 'done' column to track search progress
-            })
+    # Calculate cell corners
+    south = np.broadcast_to(MD_SOUTH + i * cell_height, (GRID_ROWS, GRID_COLS))
+    north = np.broadcast_to(MD_SOUTH + (i + 1) * cell_height, (GRID_ROWS, GRID_COLS))
+    west = np.broadcast_to(MD_WEST + j * cell_width, (GRID_ROWS, GRID_COLS))
+    east = np.broadcast_to(MD_WEST + (j + 1) * cell_width, (GRID_ROWS, GRID_COLS))
+    
+    # Calculate cell center
+    center_lat = (south + north) / 2
+    center_lng = (west + east) / 2
+    
+    # Calculate search radius; Numba is only imported for very large grids, where the JIT compile pays off
+    radius = None
+    if GRID_ROWS * GRID_COLS > NUMBA_MIN_CELLS:
+        radius = calculate_search_radii_numba(center_lat, cell_height, cell_width)
+    if radius is None:
+        # Cells in a row share a latitude, so the cosine is taken once per row and broadcast
+        row_cos = np.cos(np.radians(center_lat[:, :1]))
+        radius = np.broadcast_to(calculate_search_radius(row_cos, cell_height, cell_width), (GRID_ROWS, GRID_COLS))
+    
+    grid_df = pd.DataFrame({
+        'cell_id': [f"{r}_{c}" for r in range(GRID_ROWS) for c in range(GRID_COLS)],
+        'south_lat': south.ravel(),
+        'north_lat': north.ravel(),
+        'west_lng': west.ravel(),
+        'east_lng': east.ravel(),
+        'center_lat': center_lat.ravel(),
+        'center_lng': center_lng.ravel(),
+        'search_radius_m': radius.ravel(),
+        'done': 'no',  # Add 'done' column to track search progress
+        'parent': '',  # Cell this one was subdivided from (empty for the base grid)
+        'depth': 0  # Number of subdivisions below the base grid
+    })
     
-    # Convert to DataFrame and export to CSV
-    grid_df = pd.DataFrame(grid_cells)
+    # Export to CSV
     grid_df.to_csv('maryland_grid_cells.csv', index=False)
-    print(f"Exported {len(grid_cells)} grid cells to maryland_grid_cells.csv")
-    return grid_cells
+    print(f"Exported {len(grid_df)} grid cells to maryland_grid_cells.csv")
+    return grid_df
 
-# Function to update grid cell status
-def update_grid_status(cell_id, status='yes'):
+# Number of cell status updates held in memory since the grid CSV was last written
+grid_updates_since_save = 0
+
+# Function to update grid cell status in memory, writing the CSV every GRID_SAVE_INTERVAL updates
+def update_grid_status(grid_df, cell_id, status='yes'):
+    global grid_updates_since_save
+    grid_df.at[cell_id, 'done'] = status
+    print(f"Updated cell {cell_id} status to {status}")
+    grid_updates_since_save += 1
+    if grid_updates_since_save >= GRID_SAVE_INTERVAL:
+        save_grid_status(grid_df)
+
+# Function to write the in-memory grid status back to CSV
+def save_grid_status(grid_df):
+    global grid_updates_since_save
     try:
-        # Read the current grid cell file
-        grid_df = pd.read_csv('maryland_grid_cells.csv')
-        # Update the status of the specified cell
-        grid_df.loc[grid_df['cell_id'] == cell_id, 'done'] = status
-        # Save back to CSV
+        # A cell's restaurant rows must reach disk before the cell is recorded as done
+        flush_restaurants_csv()
         grid_df.to_csv('maryland_grid_cells.csv', index=False)
-        print(f"Updated cell {cell_id} status to {status}")
+        grid_updates_since_save = 0
     except Exception as e:
-        print(f"Warning: Failed to update grid status: {str(e)}")
+        print(f"Warning: Failed to save grid status: {str(e)}")
+
+# Function to split a cell into four quadrant cells appended to the grid, returning their IDs
+def subdivide_cell(grid_df, cell_id):
+    cell = grid_df.loc[cell_id]
+    child_height = (cell['north_lat'] - cell['south_lat']) / 2
+    child_width = (cell['east_lng'] - cell['west_lng']) / 2
+    
+    child_ids = []
+    for k, (di, dj) in enumerate([(0, 0), (0, 1), (1, 0), (1, 1)]):
+        child_id = f"{cell_id}.{k}"
+        south = cell['south_lat'] + di * child_height
+        west = cell['west_lng'] + dj * child_width
+        center_lat = south + child_height / 2
+        center_lng = west + child_width / 2
+        grid_df.loc[child_id] = pd.Series({
+            'cell_id': child_id,
+            'south_lat': south,
+            'north_lat': south + child_height,
+            'west_lng': west,
+            'east_lng': west + child_width,
+            'center_lat': center_lat,
+            'center_lng': center_lng,
+            'search_radius_m': int(calculate_search_radius(np.cos(np.radians(center_lat)), child_height, child_width)),
+            'done': 'no',
+            'parent': cell_id,
+            'depth': cell['depth'] + 1
+        })
+        child_ids.append(child_id)
+    
+    print(f"Cell {cell_id} reached Yelp's {YELP_MAX_RESULTS}-result cap; split into {', '.join(child_ids)}")
+    return child_ids
+
+# Build one rectangle patch per grid cell
+def grid_cell_rectangles(grid_cells):
+    return [Rectangle((cell['west_lng'], cell['south_lat']),
+                      cell['east_lng'] - cell['west_lng'], cell['north_lat'] - cell['south_lat'])
+            for cell in grid_cells]
+
+# Function to fingerprint everything the cached map is drawn from: grid geometry, radii, zoom and styling
+def grid_figure_key(grid_cells):
+    render_inputs = [GRID_FIGURE_VERSION, BASEMAP_ZOOM, MD_NORTH, MD_SOUTH, MD_EAST, MD_WEST]
+    render_inputs += [(cell['cell_id'], *(float(cell[k]) for k in ('south_lat', 'north_lat', 'west_lng', 'east_lng',
+                                                                  'center_lat', 'center_lng', 'search_radius_m')))
+                      for cell in grid_cells]
+    return hashlib.sha256(repr(render_inputs).encode('utf-8')).hexdigest()
+
+# Function to pickle the rendered map (basemap and grid, without progress) for reuse
+def save_grid_figure(fig, grid_cells):
+    try:
+        with open('maryland_grid_figure.pkl', 'wb') as f:
+            pickle.dump((grid_figure_key(grid_cells), fig), f)
+    except Exception as e:
+        print(f"Warning: Failed to cache grid figure: {str(e)}")
+
+# Function to load the cached map, if it was rendered from the same inputs
+def load_grid_figure(grid_cells):
+    try:
+        if os.path.isfile('maryland_grid_figure.pkl'):
+            with open('maryland_grid_figure.pkl', 'rb') as f:
+                key, fig = pickle.load(f)
+            if key == grid_figure_key(grid_cells):
+                return fig
+    except Exception as e:
+        print(f"Warning: Failed to load cached grid figure: {str(e)}")
+    return None
+
+# Function to mark completed cells on the map and save it as PNG and JPG
+def save_grid_visualization(fig, grid_cells):
+    import matplotlib.pyplot as plt
+    
+    ax = fig.axes[0]
+    done_cells = [cell for cell in grid_cells if cell['done'] == 'yes']
+    ax.scatter([cell['center_lng'] for cell in done_cells], [cell['center_lat'] for cell in done_cells],
+               s=8**2, c='green', zorder=4, label='Completed Cells')
+    ax.legend(loc='upper right')
+    
+    # Save as PNG with high quality (JPG can lose quality with maps)
+    fig.savefig('maryland_grid_visualization.png', dpi=300, bbox_inches='tight')
+    print("Grid visualization with map saved as maryland_grid_visualization.png")
+    
+    # Also save as JPG as originally requested, converted from the PNG instead of rasterizing again
+    from PIL import Image
+    with Image.open('maryland_grid_visualization.png') as image:
+        image.convert('RGB').save('maryland_grid_visualization.jpg', quality=90)
+    print("Grid visualization with map also saved as maryland_grid_visualization.jpg")
+    
+    plt.close(fig)
 
 # Visualize the grid and save as JPG
 def visualize_grid(grid_cells):
+    import matplotlib.pyplot as plt
+    
+    # Reuse the cached map when the grid is unchanged; only the progress overlay is redrawn
+    fig = load_grid_figure(grid_cells)
+    if fig is not None:
+        print("Using cached grid map from maryland_grid_figure.pkl")
+        save_grid_visualization(fig, grid_cells)
+        return
+    
     try:
         # Import necessary libraries for map visualization
         import contextily as ctx
-        import matplotlib.pyplot as plt
         from matplotlib.pyplot import cm
         
+        # Keep downloaded map tiles on disk so later runs render without refetching them
+        ctx.set_cache_dir(TILE_CACHE_DIR)
+        
         plt.figure(figsize=(15, 12))
         
         # Create base plot with Maryland boundaries
@@ -93,27 +281,26 @@ def visualize_grid(grid_cells):
                 [MD_SOUTH, MD_SOUTH, MD_NORTH, MD_NORTH, MD_SOUTH], 
                 'r-', linewidth=3, alpha=0.7, label='Maryland Boundaries')
         
-        # Plot each grid cell
+        # Draw all grid cells as one collection (a single artist instead of one per cell)
+        plt.gca().add_collection(PatchCollection(
+            grid_cell_rectangles(grid_cells), facecolor='none', edgecolor='blue', linewidth=1.5, alpha=0.7))
+        
+        # Draw search radius for each cell (circular approximation)
+        circles = [Circle((cell['center_lng'], cell['center_lat']),
+                          cell['search_radius_m'] / 111000)  # rough conversion from meters to degrees
+                   for cell in grid_cells]
+        plt.gca().add_collection(PatchCollection(
+            circles, facecolor='none', edgecolor='green', linewidth=1.2, alpha=1.0, linestyle='--'))
+        
+        # Add a small dot at each center point
+        plt.scatter([cell['center_lng'] for cell in grid_cells], [cell['center_lat'] for cell in grid_cells],
+                    s=4**2, c='red', zorder=2)
+        
+        # Add cell ID label in the center
         for cell in grid_cells:
-            width = cell['east_lng'] - cell['west_lng']
-            height = cell['north_lat'] - cell['south_lat']
-            rect = Rectangle((cell['west_lng'], cell['south_lat']), width, height, 
-                           fill=False, edgecolor='blue', linewidth=1.5, alpha=0.7)
-            plt.gca().add_patch(rect)
-            
-            # Add cell ID label in the center
             plt.text(cell['center_lng'], cell['center_lat'], cell['cell_id'], 
                    ha='center', va='center', fontsize=9, 
                    bbox=dict(facecolor='white', alpha=0.7, boxstyle='round,pad=0.3'))
-            
-            # Add a small dot at the center point
-            plt.plot(cell['center_lng'], cell['center_lat'], 'ro', markersize=4)
-            
-            # Draw search radius for each cell (circular approximation)
-            radius_deg = cell['search_radius_m'] / 111000  # rough conversion from meters to degrees
-            circle = plt.Circle((cell['center_lng'], cell['center_lat']), radius_deg, 
-                              fill=False, color='green', linewidth=1.2, alpha=1.0, linestyle='--')
-            plt.gca().add_patch(circle)
         
         # Set plot limits with a bit of padding
         padding = 0.1
@@ -124,7 +311,7 @@ def visualize_grid(grid_cells):
         ax = plt.gca()
         # Force CRS to EPSG:4326 (standard lat/lon) to ensure exact coordinate alignment
         ctx.add_basemap(ax, crs='EPSG:4326', source=ctx.providers.OpenStreetMap.Mapnik, 
-                        zoom=11, attribution_size=8)
+                        zoom=BASEMAP_ZOOM, attribution_size=8)
         
         # Ensure axis ticks match the exact coordinates
         plt.xticks(np.arange(round(MD_WEST - padding, 1), round(MD_EAST + padding, 1), 0.5))
@@ -139,17 +326,11 @@ def visualize_grid(grid_cells):
         plt.plot([], [], 'b-', linewidth=1.5, alpha=0.7, label='Grid Cells')
         plt.plot([], [], 'ro', markersize=4, label='Search Points')
         plt.plot([], [], 'g--', linewidth=1.2, alpha=0.5, label='Search Radius')
-        plt.legend(loc='upper right')
-        
-        # Save as PNG with high quality (JPG can lose quality with maps)
-        plt.savefig('maryland_grid_visualization.png', dpi=300, bbox_inches='tight')
-        print("Grid visualization with map saved as maryland_grid_visualization.png")
         
-        # Also save as JPG as originally requested
-        plt.savefig('maryland_grid_visualization.jpg', dpi=300, bbox_inches='tight')
-        print("Grid visualization with map also saved as maryland_grid_visualization.jpg")
+        # Cache the static map layers so later runs skip the tile fetch and redraw
+        save_grid_figure(plt.gcf(), grid_cells)
         
-        plt.close()
+        save_grid_visualization(plt.gcf(), grid_cells)
         
     except ImportError:
         print("Warning: contextily package not found. Installing required packages...")
@@ -163,20 +344,18 @@ def visualize_grid(grid_cells):
                 [MD_SOUTH, MD_SOUTH, MD_NORTH, MD_NORTH, MD_SOUTH], 
                 'k-', linewidth=2, label='Maryland Boundaries')
         
-        # Plot each grid cell
+        # Draw all grid cells as one collection
+        plt.gca().add_collection(PatchCollection(
+            grid_cell_rectangles(grid_cells), facecolor='none', edgecolor='blue', alpha=0.5))
+        
+        # Add a small dot at each center point
+        plt.scatter([cell['center_lng'] for cell in grid_cells], [cell['center_lat'] for cell in grid_cells],
+                    s=3**2, c='red', zorder=2)
+        
+        # Add cell ID label in the center
         for cell in grid_cells:
-            width = cell['east_lng'] - cell['west_lng']
-            height = cell['north_lat'] - cell['south_lat']
-            rect = Rectangle((cell['west_lng'], cell['south_lat']), width, height, 
-                           fill=False, edgecolor='blue', alpha=0.5)
-            plt.gca().add_patch(rect)
-            
-            # Add cell ID label in the center
             plt.text(cell['center_lng'], cell['center_lat'], cell['cell_id'], 
                    ha='center', va='center', fontsize=8)
-            
-            # Add a small dot at the center point
-            plt.plot(cell['center_lng'], cell['center_lat'], 'ro', markersize=3)
         
         plt.xlabel('Longitude')
         plt.ylabel('Latitude')
@@ -189,16 +368,37 @@ def visualize_grid(grid_cells):
         
         plt.close()
 
-# Function to calculate search radius (in meters) to cover cell
-def calculate_search_radius(lat, lng, cell_height, cell_width):
+# Function to calculate search radius (in meters) to cover cell from the cosine of its center
+# latitude; accepts a scalar or an array so callers can reuse one cosine for cells sharing a latitude
+def calculate_search_radius(lat_cos, cell_height, cell_width):
     # Convert degrees to approx meters (1° latitude ≈ 111,000 meters)
     lat_meters = cell_height * 111000 / 2
-    # Longitude degrees vary with latitude
-    lng_meters = cell_width * 111000 * math.cos(math.radians(lat)) / 2
+    # Longitude degrees shrink with the cosine of latitude
+    lng_meters = cell_width * 111000 * lat_cos / 2
     # Calculate diagonal radius (with 20% overlap)
-    radius = math.sqrt(lat_meters**2 + lng_meters**2) * 1.2
+    radius = np.sqrt(lat_meters**2 + lng_meters**2) * 1.2
     # Yelp API maximum radius is 40000 meters
-    return min(int(radius), 40000)
+    return np.minimum(radius.astype(int), 40000)
+
+# Parallel compiled version of calculate_search_radius over a whole grid of center latitudes;
+# returns None when Numba is not installed so the caller can fall back to NumPy
+def calculate_search_radii_numba(center_lat, cell_height, cell_width):
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+    
+    @njit(parallel=True)
+    def search_radii(center_lat, cell_height, cell_width):
+        lat_meters = cell_height * 111000 / 2
+        flat_lat = center_lat.ravel()
+        radius = np.empty(flat_lat.size, dtype=np.int64)
+        for k in prange(flat_lat.size):
+            lng_meters = cell_width * 111000 * math.cos(math.radians(flat_lat[k])) / 2
+            radius[k] = min(int(math.sqrt(lat_meters**2 + lng_meters**2) * 1.2), 40000)
+        return radius.reshape(center_lat.shape)
+    
+    return search_radii(center_lat, cell_height, cell_width)
 
 # Function to load existing grid status
 def load_grid_status():
@@ -206,7 +406,11 @@ def load_grid_status():
     try:
         if os.path.isfile('maryland_grid_cells.csv'):
             grid_df = pd.read_csv('maryland_grid_cells.csv')
-            print(f"Loaded grid status: {len(grid_df)} cells, {len(grid_df[grid_df['done'] == 'yes'])} completed")
+            # Grid files written before cells could be subdivided have no parent/depth columns
+            grid_df['parent'] = grid_df['parent'].fillna('') if 'parent' in grid_df else ''
+            if 'depth' not in grid_df:
+                grid_df['depth'] = 0
+            print(f"Loaded grid status: {len(grid_df)} cells, {(grid_df['done'] == 'yes').sum()} completed")
             return grid_df
         else:
             print("No existing grid file found. Will create a new one.")
@@ -215,74 +419,355 @@ def load_grid_status():
         print(f"Error loading grid status: {str(e)}. Generating new grid.")
         return generate_grid_coordinates()
 
+# Function to mark cells that miss Maryland's actual outline as skipped, so no API calls are spent on them
+def skip_cells_outside_boundary(grid_df):
+    if not os.path.isfile(MD_BOUNDARY_FILE):
+        return
+    try:
+        import geopandas as gpd
+        import shapely
+        
+        maryland = gpd.read_file(MD_BOUNDARY_FILE).to_crs(epsg=4326).union_all()
+        shapely.prepare(maryland)
+        # Test every cell rectangle against the outline in one vectorized call
+        cells = shapely.box(grid_df['west_lng'], grid_df['south_lat'], grid_df['east_lng'], grid_df['north_lat'])
+        skip_mask = (grid_df['done'] == 'no') & ~shapely.intersects(cells, maryland)
+    except Exception as e:
+        print(f"Warning: Failed to filter grid cells by {MD_BOUNDARY_FILE}: {str(e)}")
+        return
+    
+    if skip_mask.any():
+        grid_df.loc[skip_mask, 'done'] = 'skip'
+        save_grid_status(grid_df)
+        print(f"Marked {skip_mask.sum()} cells outside the Maryland boundary as skipped")
+
 # Function to load existing restaurants
 def load_existing_restaurants():
-    """Load existing restaurants from CSV to avoid duplicates"""
+    """Load existing restaurant IDs to avoid duplicates, parsing only CSV rows added since the last ID snapshot"""
     try:
         if os.path.isfile('maryland_restaurants.csv'):
-            restaurants_df = pd.read_csv('maryland_restaurants.csv')
-            print(f"Loaded {len(restaurants_df)} existing restaurants")
+            with open('maryland_restaurants.csv', 'rb') as f:
+                header = f.readline()
+                csv_stat = os.fstat(f.fileno())
+                
+                # Reuse the snapshot only if this is the same file and it still holds the exact bytes
+                # the snapshot ended on (a complete row); anything else means a full parse of the id column
+                restaurant_ids, covered_size = set(), len(header)
+                snapshot = load_restaurant_ids_snapshot()
+                if (snapshot is not None and snapshot['csv_inode'] == csv_stat.st_ino
+                        and len(header) <= snapshot['csv_size'] <= csv_stat.st_size):
+                    tail = snapshot['tail']
+                    f.seek(snapshot['csv_size'] - len(tail))
+                    if tail.endswith(b'\n') and f.read(len(tail)) == tail:
+                        restaurant_ids, covered_size = snapshot['ids'], snapshot['csv_size']
+                
+                # Parse only the id column of rows appended after the snapshot
+                f.seek(covered_size)
+                new_rows = f.read()
+                
+                # Remember the bytes the new snapshot ends on
+                csv_size = covered_size + len(new_rows)
+                f.seek(max(csv_size - RESTAURANT_IDS_SNAPSHOT_TAIL_BYTES, 0))
+                tail = f.read(csv_size - f.tell())
+            if new_rows:
+                new_ids = pd.read_csv(io.BytesIO(header + new_rows), usecols=['id'])['id']
+                restaurant_ids.update(new_ids)
+            print(f"Loaded {len(restaurant_ids)} existing restaurants")
             
-            # Create a dictionary of restaurants by ID for fast lookup
-            restaurant_ids = set(restaurants_df['id'].unique())
+            with open('maryland_restaurant_ids.pkl', 'wb') as f:
+                pickle.dump({'csv_inode': csv_stat.st_ino, 'csv_size': csv_size, 'tail': tail,
+                             'ids': restaurant_ids}, f)
             return restaurant_ids
         else:
             print("No existing restaurants file found")
+            # A snapshot without its CSV would claim IDs that are no longer written anywhere
+            if os.path.isfile('maryland_restaurant_ids.pkl'):
+                os.remove('maryland_restaurant_ids.pkl')
             return set()
     except Exception as e:
         print(f"Error loading restaurants: {str(e)}")
         return set()
 
-# Function to append restaurant data to CSV, checking for duplicates
-def append_to_restaurants_csv(restaurants, cell_id, existing_restaurant_ids):
-    """Append restaurants to CSV, skipping duplicates"""
-    # Filter out restaurants that already exist
-    new_restaurants = [r for r in restaurants if r['id'] not in existing_restaurant_ids]
+# Function to read the restaurant ID snapshot, or None if it is missing or unreadable
+def load_restaurant_ids_snapshot():
+    try:
+        with open('maryland_restaurant_ids.pkl', 'rb') as f:
+            snapshot = pickle.load(f)
+        if isinstance(snapshot, dict) and {'csv_inode', 'csv_size', 'tail', 'ids'} <= snapshot.keys():
+            return snapshot
+    except Exception:
+        pass
+    return None
+
+# Restaurants CSV handle, opened once in append mode and kept open for the whole run
+restaurants_csv = None
+
+# Function to open the restaurants CSV for appending, writing the header if the file is new
+def open_restaurants_csv():
+    global restaurants_csv
+    if restaurants_csv is None:
+        file_exists = os.path.isfile('maryland_restaurants.csv')
+        restaurants_csv = open('maryland_restaurants.csv', 'a', newline='', encoding='utf-8',
+                               buffering=RESTAURANTS_CSV_BUFFER_BYTES)
+        if not file_exists:
+            restaurants_csv.write(','.join(['cell_id', *RESTAURANT_FIELDS.values()]) + '\n')
+    return restaurants_csv
+
+# Function to flush buffered restaurant rows to disk
+def flush_restaurants_csv():
+    if restaurants_csv is not None:
+        restaurants_csv.flush()
+
+# Function to close the restaurants CSV at the end of a run
+def close_restaurants_csv():
+    global restaurants_csv
+    if restaurants_csv is not None:
+        restaurants_csv.close()
+        restaurants_csv = None
+
+# Function to append restaurant data to CSV
+def append_to_restaurants_csv(restaurants, cell_id):
+    """Append restaurants to CSV; duplicates are already dropped when search results arrive"""
+    # Flatten the nested Yelp records in one vectorized pass
+    df = pd.json_normalize(restaurants, sep='_', max_level=1).reindex(columns=list(RESTAURANT_FIELDS))
+    df['categories'] = df['categories'].map(
+        lambda cs: str([c['title'] for c in cs]) if isinstance(cs, list) else '[]')
+    df['location_display_address'] = df['location_display_address'].map(
+        lambda a: ', '.join(a) if isinstance(a, list) else '')
+    df = df.rename(columns=RESTAURANT_FIELDS)
+    df.insert(0, 'cell_id', cell_id)
     
-    if not new_restaurants:
-        print(f"No new restaurants to add from cell {cell_id}")
-        return 0
+    # Append data through the run-long buffered file handle
+    df.to_csv(open_restaurants_csv(), header=False, index=False)
     
-    # Convert restaurant data to DataFrame rows
-    rows = []
-    for r in new_restaurants:
-        rows.append({
-            'cell_id': cell_id,
-            'id': r['id'],
-            'name': r['name'],
-            'rating': r.get('rating'),
-            'review_count': r.get('review_count'),
-            'price': r.get('price', ''),
-            'categories': str([c['title'] for c in r.get('categories', [])]),
-            'address': ', '.join(r.get('location', {}).get('display_address', [])),
-            'city': r.get('location', {}).get('city', ''),
-            'state': r.get('location', {}).get('state', ''),
-            'zip_code': r.get('location', {}).get('zip_code', ''),
-            'latitude': r.get('coordinates', {}).get('latitude'),
-            'longitude': r.get('coordinates', {}).get('longitude'),
-            'phone': r.get('phone', ''),
-            'url': r.get('url', '')
-        })
+    print(f"Appended {len(df)} new restaurants from cell {cell_id} to maryland_restaurants.csv")
+    return len(df)
+
+# Export the restaurants CSV to compressed, typed Parquet for downstream analytics
+def export_restaurants_parquet():
+    try:
+        # Stream the CSV straight into Arrow columns, skipping a pandas copy of the whole dataset
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
         
-        # Add to the existing IDs set to avoid duplicates within this batch
-        existing_restaurant_ids.add(r['id'])
-    
-    # Create DataFrame from rows
-    df = pd.DataFrame(rows)
+        table = pa_csv.read_csv('maryland_restaurants.csv', convert_options=pa_csv.ConvertOptions(
+            column_types={'zip_code': pa.string(), 'phone': pa.string()},
+            strings_can_be_null=True
+        ))
+        pq.write_table(table, 'maryland_restaurants.parquet', compression='zstd')
+        print(f"Exported {table.num_rows} restaurants to maryland_restaurants.parquet")
+    except ImportError:
+        print("Warning: pyarrow package not found. Skipping Parquet export.")
+        print("Run: pip install pyarrow")
+    except Exception as e:
+        print(f"Warning: Failed to export Parquet: {str(e)}")
+
+# Monotonic time before which no Yelp request is sent; any HTTP 429 pushes it back for every caller
+rate_limit_resume_at = 0.0
+
+# Send a rate-limited GET request to the Yelp Fusion API, honouring Retry-After on HTTP 429
+# and retrying transient server and connection errors with exponential backoff
+async def yelp_get(session, path, params=None):
+    global rate_limit_resume_at
+    rate_limit_attempts = 0
+    transient_attempts = 0
+    while True:
+        # Wait out a rate-limit pause started by this or any other concurrent request
+        while rate_limit_resume_at > time.monotonic():
+            await asyncio.sleep(rate_limit_resume_at - time.monotonic())
+        try:
+            async with rate_limiter:
+                response = await session.get(f"{YELP_API_BASE}{path}", params=params)
+            async with response:
+                if response.status == 429 and rate_limit_attempts < RATE_LIMIT_RETRIES:
+                    wait = retry_after_seconds(response, RATE_LIMIT_BACKOFF_S * 2 ** rate_limit_attempts)
+                    rate_limit_resume_at = max(rate_limit_resume_at, time.monotonic() + wait)
+                    rate_limit_attempts += 1
+                    continue
+                if response.status in TRANSIENT_STATUSES and transient_attempts < TRANSIENT_RETRIES:
+                    await asyncio.sleep(TRANSIENT_BACKOFF_S * 2 ** transient_attempts)
+                    transient_attempts += 1
+                    continue
+                response.raise_for_status()
+                # The body is read here so a timeout or dropped connection mid-body is retried too
+                return await response.json()
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+            if transient_attempts >= TRANSIENT_RETRIES:
+                raise
+            await asyncio.sleep(TRANSIENT_BACKOFF_S * 2 ** transient_attempts)
+            transient_attempts += 1
+
+# Read the wait time from a 429 response's Retry-After header
+def retry_after_seconds(response, default):
+    try:
+        return float(response.headers['Retry-After'])
+    except (KeyError, ValueError):
+        return default
+
+# Write data to a JSON file, using the much faster orjson encoder when it is installed
+def write_json(path, data):
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+# Append records to a newline-delimited JSON file, one record per line, in a single write
+def append_ndjson(path, records):
+    if orjson is not None:
+        data = b''.join(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE) for record in records)
+    else:
+        data = ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+    with open(path, 'ab') as f:
+        f.write(data)
+
+# Function to search one page of restaurants around a point
+async def search_restaurants(session, lat, lng, radius, offset):
+    return await yelp_get(session, '/businesses/search', params={
+        'term': 'restaurant',
+        'latitude': lat,
+        'longitude': lng,
+        'radius': radius,
+        'limit': 50,  # Max results per query
+        'offset': offset,
+        'categories': 'restaurants',
+        'sort_by': 'distance'
+    })
+
+# Function to fetch full details for one business, served from the disk cache when possible
+async def fetch_business_details(session, semaphore, cache, business_id):
+    details = cache.get(business_id)
+    if details is not None:
+        return details
+    async with semaphore:
+        details = await yelp_get(session, f"/businesses/{business_id}")
+    cache.set(business_id, details, expire=DETAILS_CACHE_TTL_S)
+    return details
+
+# Check whether an exception is Yelp's HTTP 429 Too Many Requests response
+def is_rate_limit_error(e):
+    return isinstance(e, aiohttp.ClientResponseError) and e.status == 429
+
+# Search one grid cell: paginate the search results and fetch details for new businesses.
+# Returns the IDs of any quadrant cells it was split into because it hit Yelp's result cap.
+async def process_cell(session, detail_semaphore, details_cache, grid_df, cell_id,
+                       existing_restaurant_ids):
+    cell = grid_df.loc[cell_id]
+    lat = cell['center_lat']
+    lng = cell['center_lng']
+    radius = int(cell['search_radius_m'])
     
-    # Check if the file exists
-    file_exists = os.path.isfile('maryland_restaurants.csv')
+    print(f"\nProcessing cell {cell_id}: searching at {lat:.4f}, {lng:.4f} with radius {radius}m")
     
-    # Append data to CSV (create file if it doesn't exist)
-    df.to_csv('maryland_restaurants.csv', mode='a', header=not file_exists, index=False)
+    offset = 0
+    total_found = 0
+    cell_restaurants = []  # Store restaurants found in this cell
     
-    print(f"Appended {len(rows)} new restaurants from cell {cell_id} to maryland_restaurants.csv")
-    return len(rows)
+    # Search for restaurants with improved error handling
+    next_search = asyncio.create_task(search_restaurants(session, lat, lng, radius, offset))
+    try:
+        # Use pagination to get all results for this cell
+        while True:
+            try:
+                # Search for restaurants
+                search_results = await next_search
+                
+                # Process results
+                if 'businesses' in search_results and search_results['businesses']:
+                    businesses = search_results['businesses']
+                    total_found += len(businesses)
+                    
+                    # Check if we need to paginate (max 1000 results per search), and if so
+                    # request the next page while this page's details are being fetched
+                    has_next_page = len(businesses) == 50 and offset + 50 < YELP_MAX_RESULTS
+                    if has_next_page:
+                        offset += 50
+                        next_search = asyncio.create_task(search_restaurants(session, lat, lng, radius, offset))
+                    
+                    # Skip IDs already written or claimed by any cell, then claim the rest so
+                    # one set membership check is the only deduplication a business goes through
+                    new_businesses = list({b['id']: b for b in businesses
+                                           if b['id'] not in existing_restaurant_ids}.values())
+                    existing_restaurant_ids.update(b['id'] for b in new_businesses)
+                    
+                    if FETCH_DETAILS:
+                        # Get detailed info for every new business on this page concurrently
+                        results = await asyncio.gather(
+                            *[fetch_business_details(session, detail_semaphore, details_cache, b['id'])
+                              for b in new_businesses],
+                            return_exceptions=True
+                        )
+                    else:
+                        # Search results already carry every field written to the CSV
+                        results = new_businesses
+                    for business, business_details in zip(new_businesses, results):
+                        if isinstance(business_details, Exception):
+                            existing_restaurant_ids.discard(business['id'])
+                            if is_rate_limit_error(business_details):
+                                raise business_details
+                            print(f"Error getting details for {business['name']}: {str(business_details)}")
+                            continue
+                        cell_restaurants.append(business_details)
+                    
+                    if not has_next_page:
+                        break
+                else:
+                    break
+                    
+            except Exception as e:
+                print(f"Error in search for cell {cell_id}: {str(e)}")
+                
+                # Specific handling for 429 Too Many Requests error
+                if is_rate_limit_error(e):
+                    print(f"Rate limit exceeded for cell {cell_id}. Marking as incomplete.")
+                    # Save whatever data we've collected from this cell
+                    if cell_restaurants:
+                        append_to_restaurants_csv(cell_restaurants, cell_id)
+                        append_ndjson('maryland_restaurants_progress.ndjson', cell_restaurants)
+                    # Mark this cell as not done
+                    update_grid_status(grid_df, cell_id, 'no')
+                    raise
+                # For other errors, move on to the next cell
+                break
+        
+        # Append this cell's restaurants to the main CSV file
+        if cell_restaurants:
+            new_count = append_to_restaurants_csv(cell_restaurants, cell_id)
+            append_ndjson('maryland_restaurants_progress.ndjson', cell_restaurants)
+            print(f"Added {new_count} new unique restaurants from this cell")
+        
+        # A cell at the result cap may have dropped restaurants; queue its quadrants before
+        # marking it done so both reach the grid CSV in the same save
+        child_ids = []
+        if total_found >= YELP_MAX_RESULTS and cell['depth'] < MAX_SUBDIVISION_DEPTH:
+            child_ids = subdivide_cell(grid_df, cell_id)
+        
+        # Mark this cell as done
+        update_grid_status(grid_df, cell_id, 'yes')
+        
+        print(f"Found {total_found} restaurants in cell {cell_id} ({len(cell_restaurants)} unique in this cell)")
+        return child_ids
+        
+    except Exception as e:
+        if is_rate_limit_error(e):
+            raise
+        print(f"Error processing cell {cell_id}: {str(e)}")
+        # If there was an error, mark as not done
+        update_grid_status(grid_df, cell_id, 'no')
+        return []
+    finally:
+        # Drop a prefetched page that will not be used
+        next_search.cancel()
 
 # Main execution function
-def main():
+async def main():
     # Load existing data
     grid_df = load_grid_status()
+    # Index cells by ID so status updates are direct lookups on the in-memory frame
+    grid_df.index = grid_df['cell_id'].tolist()
+    skip_cells_outside_boundary(grid_df)
     existing_restaurant_ids = load_existing_restaurants()
     
     # Create grid cells object for visualization
@@ -292,144 +777,86 @@ def main():
     print("Visualizing Maryland grid...")
     visualize_grid(grid_cells)
     
-    all_restaurants = {}  # Using dict to ensure unique entries
-    yelp_api = YelpAPI(api_key, timeout_s=5.0)
+    # The CSV is the data store; only IDs are kept in memory, and new ones are counted from here
+    known_count = len(existing_restaurant_ids)
     
     print(f"Starting search across Maryland using a {GRID_ROWS}×{GRID_COLS} grid")
-    cell_count = 0
+    
+    # Collect the cells that still need searching with one pass over the status column
+    done_mask = grid_df['done'].isin(['yes', 'skip'])
+    print(f"Skipping {done_mask.sum()} completed or out-of-state cells")
+    pending_cells = grid_df.loc[~done_mask, 'cell_id'].tolist()
+    
+    # One shared session keeps connections to Yelp alive for the whole run; the pool
+    # is sized to the maximum number of concurrent requests so none waits on a handshake
+    session = aiohttp.ClientSession(
+        headers={'Authorization': f"Bearer {api_key}"},
+        timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_S),
+        connector=aiohttp.TCPConnector(
+            limit=MAX_CONCURRENT_CELLS + MAX_CONCURRENT_DETAILS,
+            keepalive_timeout=KEEPALIVE_TIMEOUT_S,
+            ttl_dns_cache=300
+        )
+    )
+    # Bound concurrent detail requests to respect Yelp's QPS limit
+    detail_semaphore = asyncio.Semaphore(MAX_CONCURRENT_DETAILS)
+    # Cells run concurrently; the shared rate limiter handles global pacing
+    cell_semaphore = asyncio.Semaphore(MAX_CONCURRENT_CELLS)
+    # Details survive across runs so re-runs and overlapping cells skip the API
+    details_cache = diskcache.Cache(DETAILS_CACHE_DIR) if FETCH_DETAILS else None
+    
+    async def search_cell(cell_id):
+        async with cell_semaphore:
+            return await process_cell(session, detail_semaphore, details_cache, grid_df, cell_id,
+                                      existing_restaurant_ids)
+    
+    tasks = {asyncio.create_task(search_cell(cell_id)) for cell_id in pending_cells}
     
     try:
-        # Process each cell in the grid
-        for i in range(GRID_ROWS):
-            for j in range(GRID_COLS):
-                cell_id = f"{i}_{j}"
-                cell_count += 1
-                
-                # Check if this cell is already done
-                if grid_df.loc[grid_df['cell_id'] == cell_id, 'done'].iloc[0] == 'yes':
-                    print(f"\nSkipping completed cell {cell_count}/{GRID_ROWS*GRID_COLS}: {cell_id}")
-                    continue
-                
-                print(f"\nProcessing cell {cell_count}/{GRID_ROWS*GRID_COLS}: {cell_id}")
-                
-                # Calculate cell center coordinates
-                lat = MD_SOUTH + (i + 0.5) * cell_height
-                lng = MD_WEST + (j + 0.5) * cell_width
-                
-                # Calculate appropriate search radius
-                radius = calculate_search_radius(lat, lng, cell_height, cell_width)
-                
-                print(f"Searching at {lat:.4f}, {lng:.4f} with radius {radius}m")
-                
-                offset = 0
-                total_found = 0
-                cell_restaurants = []  # Store restaurants found in this cell
-                
-                # Search for restaurants with improved error handling
-                try:
-                    # Use pagination to get all results for this cell
-                    while True:
-                        try:
-                            # Search for restaurants
-                            search_results = yelp_api.search_query(
-                                term="restaurant",
-                                latitude=lat,
-                                longitude=lng,
-                                radius=radius,
-                                limit=50,  # Max results per query
-                                offset=offset,
-                                categories="restaurants",
-                                sort_by="distance"
-                            )
-                            
-                            # Process results
-                            if 'businesses' in search_results and search_results['businesses']:
-                                businesses = search_results['businesses']
-                                total_found += len(businesses)
-                                
-                                # Get detailed info for each business
-                                for business in businesses:
-                                    business_id = business['id']
-                                    if business_id not in all_restaurants and business_id not in existing_restaurant_ids:
-                                        try:
-                                            # Get full business details
-                                            business_details = yelp_api.business_query(id=business_id)
-                                            all_restaurants[business_id] = business_details
-                                            cell_restaurants.append(business_details)
-                                            time.sleep(0.2)  # Respect rate limits
-                                        except Exception as e:
-                                            print(f"Error getting details for {business['name']}: {str(e)}")
-                                
-                                # Check if we need to paginate (max 1000 results per search)
-                                if len(businesses) < 50 or offset > 950:
-                                    break
-                                
-                                # Next page
-                                offset += 50
-                                time.sleep(0.5)
-                            else:
-                                break
-                                
-                        except Exception as e:
-                            error_msg = str(e)
-                            print(f"Error in search: {error_msg}")
-                            
-                            # Specific handling for 429 Too Many Requests error
-                            if "429 Client Error: Too Many Requests" in error_msg:
-                                print(f"Rate limit exceeded for cell {cell_id}. Marking as incomplete.")
-                                # Save whatever data we've collected from this cell
-                                if cell_restaurants:
-                                    append_to_restaurants_csv(cell_restaurants, cell_id, existing_restaurant_ids)
-                                # Mark this cell as not done
-                                update_grid_status(cell_id, 'no')
-                                # Save current progress to JSON
-                                with open('maryland_restaurants_progress.json', 'w') as f:
-                                    json.dump(list(all_restaurants.values()), f)
-                                exit(1)
-                            else:
-                                # For other errors, wait a bit and continue
-                                time.sleep(2)
-                                break
-                    
-                    # Append this cell's restaurants to the main CSV file
-                    if cell_restaurants:
-                        new_count = append_to_restaurants_csv(cell_restaurants, cell_id, existing_restaurant_ids)
-                        print(f"Added {new_count} new unique restaurants from this cell")
-                    
-                    # Mark this cell as done
-                    update_grid_status(cell_id, 'yes')
-                    
-                    print(f"Found {total_found} restaurants in cell {cell_id} ({len(cell_restaurants)} unique in this cell)")
-                    
-                except Exception as e:
-                    print(f"Error processing cell {cell_id}: {str(e)}")
-                    # If there was an error, mark as not done
-                    update_grid_status(cell_id, 'no')
-                
-                # Save progress periodically to JSON (backup)
-                if cell_count % 5 == 0:
-                    with open('maryland_restaurants_progress.json', 'w') as f:
-                        json.dump(list(all_restaurants.values()), f)
-                
-                time.sleep(1)  # Brief pause between cells
+        cells_done = 0
+        try:
+            # Subdivided cells add their quadrants to the set of running searches
+            while tasks:
+                finished, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    tasks.remove(task)
+                    tasks |= {asyncio.create_task(search_cell(child_id)) for child_id in task.result()}
+                    cells_done += 1
+                print(f"Completed {cells_done} cells, {len(tasks)} pending")
+        except Exception as e:
+            if not is_rate_limit_error(e):
+                raise
+            # Stop the remaining cells; they stay marked as not done
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            exit(1)
         
-        # Save final results as JSON (backup)
-        restaurant_list = list(all_restaurants.values())
-        with open('maryland_restaurants_json_backup.json', 'w') as f:
-            json.dump(restaurant_list, f)
+        # Save the known restaurant IDs as JSON (backup); full records are in the CSV and NDJSON log
+        write_json('maryland_restaurants_json_backup.json', sorted(existing_restaurant_ids))
         
-        print(f"\nSearch complete! Found {len(restaurant_list)} new unique restaurants in Maryland.")
-        print(f"Total restaurants in database: {len(existing_restaurant_ids) + len(restaurant_list)}")
+        print(f"\nSearch complete! Found {len(existing_restaurant_ids) - known_count} new unique restaurants in Maryland.")
+        print(f"Total restaurants in database: {len(existing_restaurant_ids)}")
+        close_restaurants_csv()
         print("All data has been saved to maryland_restaurants.csv")
+        export_restaurants_parquet()
         print("Grid cell statuses have been updated in maryland_grid_cells.csv")
         
     except Exception as e:
         print(f"An error occurred: {str(e)}")
-        # Save whatever data we've collected so far
-        if all_restaurants:
-            with open('maryland_restaurants_emergency_save.json', 'w') as f:
-                json.dump(list(all_restaurants.values()), f)
+        # Save the IDs collected so far; their records are already in the CSV and NDJSON log
+        if len(existing_restaurant_ids) > known_count:
+            write_json('maryland_restaurants_emergency_save.json', sorted(existing_restaurant_ids))
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Persist any status updates not yet written, including on the rate-limit exit
+        save_grid_status(grid_df)
+        close_restaurants_csv()
+        await session.close()
+        if details_cache is not None:
+            details_cache.close()
 
 # Call the main function to start execution
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())